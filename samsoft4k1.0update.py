@@ -6,13 +6,22 @@ Built with Pygame
 
 Optimized for 60 FPS:
 - Fixed-timestep physics (60 Hz) with busy-loop cap
-- Spatial grid collision (tile hash)
+- Static platform AABBs packed into contiguous NumPy columns for collisions
 - Float positions; integer rects for render/collide
+- Physics sub-steps JIT-compiled with Numba (pure-Python fallback)
 - Converted surfaces for faster blits
 """
 
-import pygame, sys, random
-from collections import defaultdict
+import pygame, random
+from array import array
+import numpy as np
+try:
+    from numba import njit
+except ImportError:  # no JIT available: run the kernels as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
 
 pygame.init()
 W, H = 800, 600
@@ -46,14 +55,25 @@ FRICTION = 0.2
 MAX_WALK = 4
 MAX_RUN = 6
 
+# Scancodes cached at module scope for the per-step key reads
+_K_LEFT = pygame.K_LEFT
+_K_RIGHT = pygame.K_RIGHT
+_K_LSHIFT = pygame.K_LSHIFT
+_K_RSHIFT = pygame.K_RSHIFT
+_K_SPACE = pygame.K_SPACE
+
+# Key-state bits passed to the physics kernel
+KEY_LEFT, KEY_RIGHT, KEY_RUN, KEY_JUMP = 1, 2, 4, 8
+
 FONT = pygame.font.SysFont("Arial", 16, bold=True)
 
 # -------------------------------------------------
 # Mega Connector: Procedural assets (converted)
 # -------------------------------------------------
-def make_surface(size, color, shape="rect"):
+def make_surface(size, color, shape="rect", alpha: bool = True):
     # Note: display is already created; safe to convert for fast blits.
-    surf = pygame.Surface(size, pygame.SRCALPHA, 32)
+    # Fully opaque assets pass alpha=False to skip per-pixel blending.
+    surf = pygame.Surface(size, pygame.SRCALPHA, 32) if alpha else pygame.Surface(size)
     if shape == "rect":
         surf.fill(color)
     elif shape == "circle":
@@ -64,175 +84,233 @@ def make_surface(size, color, shape="rect"):
     elif shape == "castle":
         surf.fill((128, 128, 128))
         pygame.draw.rect(surf, (60, 60, 60), (5, 5, size[0]-10, size[1]-10), 3)
-    return surf.convert_alpha()
+    return surf.convert_alpha() if alpha else surf.convert()
 
 ASSETS = {
     "mario_small": make_surface((32, 32), (255, 0, 0)),
-    "brick": make_surface((TILE, TILE), (139, 69, 19)),
+    "brick": make_surface((TILE, TILE), (139, 69, 19), alpha=False),
     "flag": make_surface((20, 160), (0, 200, 0), shape="flag"),
     "node": make_surface((30, 30), (0, 100, 255), shape="circle"),
-    "castle": make_surface((60, 60), (128, 128, 128), shape="castle"),
+    "castle": make_surface((60, 60), (128, 128, 128), shape="castle", alpha=False),
 }
 NODE_LOCKED = make_surface((30, 30), (200, 200, 200), shape="circle")
 
+# Reused (surface, dest) buffers for Surface.blits batching; cleared each frame
+_NODE_BLITS: list = []
+_LABEL_BLITS: list = []
+
 # -------------------------------------------------
-# Spatial grid for collisions (tile-size hashing)
+# Physics kernels (Numba)
 # -------------------------------------------------
-class SpatialGrid:
-    __slots__ = ("cell", "grid")
-    def __init__(self, cell=TILE):
-        self.cell = cell
-        self.grid: dict[tuple[int, int], list[pygame.Rect]] = defaultdict(list)
-
-    def _cells_for(self, rect: pygame.Rect):
-        cs = self.cell
-        x0 = rect.left // cs
-        x1 = (rect.right - 1) // cs
-        y0 = rect.top // cs
-        y1 = (rect.bottom - 1) // cs
-        for x in range(x0, x1 + 1):
-            for y in range(y0, y1 + 1):
-                yield (x, y)
-
-    def add(self, rect: pygame.Rect):
-        for c in self._cells_for(rect):
-            self.grid[c].append(rect)
-
-    def query(self, rect: pygame.Rect):
-        seen = set()
-        out = []
-        for c in self._cells_for(rect):
-            lst = self.grid.get(c)
-            if lst:
-                for r in lst:
-                    ir = id(r)
-                    if ir not in seen:
-                        seen.add(ir)
-                        out.append(r)
-        return out
+@njit(cache=True)
+def resolve_axis(pos, vel, rect_l, rect_t, w, h, ab_l, ab_t, ab_r, ab_b, axis):
+    """Push a w*h box at (rect_l, rect_t) out of overlapping AABBs along one axis.
+
+    Returns (pos, vel, coord, on_ground); coord is the corrected integer
+    left edge for axis 0, top edge for axis 1.
+    """
+    x = rect_l
+    y = rect_t
+    on_ground = False
+    for i in range(ab_l.shape[0]):
+        if x < ab_r[i] and x + w > ab_l[i] and y < ab_b[i] and y + h > ab_t[i]:
+            if axis == 0:
+                if vel > 0:
+                    x = ab_l[i] - w
+                elif vel < 0:
+                    x = ab_r[i]
+                pos = float(x)
+            else:
+                if vel > 0:
+                    y = ab_t[i] - h
+                    on_ground = True
+                elif vel < 0:
+                    y = ab_b[i]
+                pos = float(y)
+            vel = 0.0
+    return pos, vel, (x if axis == 0 else y), on_ground
+
+@njit(cache=True)
+def tick(state, keys_bits, n_substeps, w, h, ab_l, ab_t, ab_r, ab_b,
+         flag_l, flag_t, flag_r, flag_b):
+    """Run up to n_substeps fixed physics steps on state in place.
+
+    state is [pos_x, pos_y, vel_x, vel_y, on_ground] (float64). Stops early
+    after the sub-step in which the box first touches the flag; returns the
+    number of sub-steps run.
+    """
+    left = (keys_bits & KEY_LEFT) != 0
+    right = (keys_bits & KEY_RIGHT) != 0
+    run = (keys_bits & KEY_RUN) != 0
+    jump = (keys_bits & KEY_JUMP) != 0
+    accel = RUN_ACCEL if run else WALK_ACCEL
+    max_speed = float(MAX_RUN) if run else float(MAX_WALK)
+
+    pos_x, pos_y, vel_x, vel_y = state[0], state[1], state[2], state[3]
+    on_ground = state[4] != 0.0
+    x, y = int(pos_x), int(pos_y)
+    n = 0
+    while n < n_substeps:
+        n += 1
+        if left and not right:
+            vel_x -= accel
+        elif right and not left:
+            vel_x += accel
+        elif vel_x > 0:
+            vel_x = max(0.0, vel_x - FRICTION)
+        elif vel_x < 0:
+            vel_x = min(0.0, vel_x + FRICTION)
+        if vel_x > max_speed: vel_x = max_speed
+        if vel_x < -max_speed: vel_x = -max_speed
+
+        if jump and on_ground:
+            vel_y = JUMP_VELOCITY
+            on_ground = False
+
+        # Gravity
+        vel_y = min(vel_y + GRAVITY, 12.0)
+
+        # Move X, resolve collisions. The box never rests inside an AABB, so
+        # if its integer rect didn't move there is nothing to resolve.
+        pos_x += vel_x
+        if int(pos_x) != x:
+            pos_x, vel_x, x, _ = resolve_axis(pos_x, vel_x, int(pos_x), y, w, h,
+                                              ab_l, ab_t, ab_r, ab_b, 0)
+        # Move Y, resolve collisions (same early-out; no contact means airborne)
+        pos_y += vel_y
+        if int(pos_y) != y:
+            pos_y, vel_y, y, on_ground = resolve_axis(pos_y, vel_y, x, int(pos_y), w, h,
+                                                      ab_l, ab_t, ab_r, ab_b, 1)
+        else:
+            on_ground = False
+
+        if x < flag_r and x + w > flag_l and y < flag_b and y + h > flag_t:
+            break
+
+    state[0], state[1], state[2], state[3] = pos_x, pos_y, vel_x, vel_y
+    state[4] = 1.0 if on_ground else 0.0
+    return n
+
+# Warm the JIT before main() so the first level doesn't pay for compilation
+_warm = np.zeros(1, dtype=np.int32)
+tick(np.zeros(5), 0, 1, 1, 1, _warm, _warm, _warm, _warm, 0, 0, 0, 0)
+del _warm
 
 # -------------------------------------------------
 # Mario
 # -------------------------------------------------
-class Mario(pygame.sprite.Sprite):
-    __slots__ = ("image","rect","pos_x","pos_y","vel_x","vel_y","on_ground")
+class Mario:
+    __slots__ = ("image","rect","pos_x","pos_y","vel_x","vel_y","on_ground","_state")
     def __init__(self, x, y):
-        super().__init__()
         self.image = ASSETS["mario_small"]
         self.rect = self.image.get_rect(topleft=(x, y))
+        self._state = np.zeros(5)  # scratch [pos_x, pos_y, vel_x, vel_y, on_ground] for tick
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        # Re-arm in place; image/rect are kept so pooled instances don't reallocate
+        self.rect.topleft = (x, y)
         self.pos_x = float(self.rect.x)
         self.pos_y = float(self.rect.y)
         self.vel_x = 0.0
         self.vel_y = 0.0
         self.on_ground = False
 
-    def step(self, keys, level):
-        shift = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
-        accel = RUN_ACCEL if shift else WALK_ACCEL
-
-        left = keys[pygame.K_LEFT]
-        right = keys[pygame.K_RIGHT]
-
-        if left and not right:
-            self.vel_x -= accel
-        elif right and not left:
-            self.vel_x += accel
-        else:
-            if self.vel_x > 0:
-                self.vel_x = max(0.0, self.vel_x - FRICTION)
-            elif self.vel_x < 0:
-                self.vel_x = min(0.0, self.vel_x + FRICTION)
-
-        max_speed = MAX_RUN if shift else MAX_WALK
-        if self.vel_x > max_speed: self.vel_x = max_speed
-        if self.vel_x < -max_speed: self.vel_x = -max_speed
-
-        if keys[pygame.K_SPACE] and self.on_ground:
-            self.vel_y = JUMP_VELOCITY
-            self.on_ground = False
-
-        # Gravity
-        self.vel_y = min(self.vel_y + GRAVITY, 12)
-
-        # --- Move X, resolve collisions
-        self.pos_x += self.vel_x
-        self.rect.x = int(self.pos_x)
-        for p in level.get_colliders(self.rect):
-            if self.rect.colliderect(p):
-                if self.vel_x > 0:
-                    self.rect.right = p.left
-                elif self.vel_x < 0:
-                    self.rect.left = p.right
-                self.pos_x = float(self.rect.x)
-                self.vel_x = 0.0
-
-        # --- Move Y, resolve collisions
-        self.pos_y += self.vel_y
-        self.rect.y = int(self.pos_y)
-        self.on_ground = False
-        for p in level.get_colliders(self.rect):
-            if self.rect.colliderect(p):
-                if self.vel_y > 0:
-                    self.rect.bottom = p.top
-                    self.on_ground = True
-                elif self.vel_y < 0:
-                    self.rect.top = p.bottom
-                self.pos_y = float(self.rect.y)
-                self.vel_y = 0.0
+    def step(self, keys, level, n_substeps=1):
+        """Advance up to n_substeps fixed steps; returns how many ran (see tick)."""
+        bits = 0
+        if keys[_K_LEFT]: bits |= KEY_LEFT
+        if keys[_K_RIGHT]: bits |= KEY_RIGHT
+        if keys[_K_LSHIFT] or keys[_K_RSHIFT]: bits |= KEY_RUN
+        if keys[_K_SPACE]: bits |= KEY_JUMP
+
+        st = self._state
+        st[0], st[1], st[2], st[3] = self.pos_x, self.pos_y, self.vel_x, self.vel_y
+        st[4] = 1.0 if self.on_ground else 0.0
+        rect, flag = self.rect, level.flag
+        ab_l, ab_t, ab_r, ab_b = level.aabb_cols
+        n = tick(st, bits, n_substeps, rect.width, rect.height, ab_l, ab_t, ab_r, ab_b,
+                 flag.left, flag.top, flag.right, flag.bottom)
+
+        self.pos_x, self.pos_y = float(st[0]), float(st[1])
+        self.vel_x, self.vel_y = float(st[2]), float(st[3])
+        self.on_ground = st[4] != 0.0
+        rect.x = int(self.pos_x)
+        rect.y = int(self.pos_y)
+        return n
+
+_MARIO_POOL = Mario(0, 0)
 
 # -------------------------------------------------
 # Level
 # -------------------------------------------------
+def _gen_platforms(number, width=2000):
+    # Seeded per level number: same layout on every play, nothing random at build time
+    rng = random.Random(number)
+    xs = rng.sample(range(200, width - 200, TILE), 20)
+    ys = rng.choices([H - 200, H - 300], k=20)
+    return list(zip(xs, ys))
+
+_LEVEL_PLATFORMS = {n: _gen_platforms(n) for n in range(1, 33)}
+
+# One static backdrop surface shared by all cached levels (a 2000x600 bake is
+# ~4.8 MB); re-baked by the level that draws next
+_backdrop = None
+_backdrop_owner = None
+
 class Level:
-    __slots__ = ("number","width","platforms","blocks","flag","_view_margin","_grid")
+    __slots__ = ("number","width","platforms","blocks","flag","ground","aabb_cols")
     def __init__(self, number, width=2000):
         self.number = number
         self.platforms: list[pygame.Rect] = []
         self.blocks: list[tuple[str, pygame.Rect]] = []
         self.flag = pygame.Rect(width - 500, H - 200, 20, 160)
         self.width = width
-        self._view_margin = 80
-        self._grid = SpatialGrid(TILE)
+        self.ground = pygame.Rect(0, H - TILE, width, TILE)
         self.build()
 
     def _add_block(self, kind: str, rect: pygame.Rect):
         self.platforms.append(rect)
         self.blocks.append((kind, rect))
-        self._grid.add(rect)
 
     def build(self):
-        # Ground
-        ground_y = H - TILE
-        for x in range(0, self.width, TILE):
-            self._add_block("brick", pygame.Rect(x, ground_y, TILE, TILE))
+        # Ground: one full-width collider (platforms[0])
+        self.platforms.append(self.ground)
         # Platforms
-        for _ in range(20):
-            x = random.randint(200, self.width - 200)
-            y = random.choice([H - 200, H - 300])
+        for x, y in _LEVEL_PLATFORMS[self.number]:
             self._add_block("brick", pygame.Rect(x, y, TILE, TILE))
-
-    def get_colliders(self, rect: pygame.Rect):
-        # Inflate slightly to catch edge-touch cases during movement
-        query = rect.inflate(2, 2)
-        return self._grid.query(query)
+        # Static AABBs as contiguous int32 (left, top, right, bottom) columns;
+        # the collision kernel scans all of them (~21 rects per level)
+        self.aabb_cols = tuple(np.array(col, dtype=np.int32) for col in
+                               zip(*[(r.left, r.top, r.right, r.bottom) for r in self.platforms]))
+
+    def _bake_background(self):
+        # Sky, ground, blocks and flag are static: composite them once per entry
+        global _backdrop, _backdrop_owner
+        if _backdrop is None or _backdrop.get_width() != self.width:
+            _backdrop = pygame.Surface((self.width, H)).convert()
+        bg = _backdrop
+        bg.fill((92, 148, 252))
+        brick = ASSETS["brick"]
+        bg.blits([(brick, (x, self.ground.y)) for x in range(0, self.width, TILE)],
+                 doreturn=False)
+        # Only 'brick' kind used for tiles currently; keep switch for future assets
+        bg.blits([(brick if kind == "brick" else ASSETS[kind], rect.topleft)
+                  for kind, rect in self.blocks], doreturn=False)
+        bg.blit(ASSETS["flag"], self.flag.topleft)
+        _backdrop_owner = self
 
     def draw(self, surf, camera_x: int):
-        view_rect = pygame.Rect(camera_x - self._view_margin, 0,
-                                W + 2 * self._view_margin, H)
-        blit = surf.blit
-        brick = ASSETS["brick"]
-        for kind, rect in self.blocks:
-            if rect.colliderect(view_rect):
-                # Only 'brick' kind used for tiles currently; keep switch for future assets
-                img = brick if kind == "brick" else ASSETS[kind]
-                blit(img, (rect.x - camera_x, rect.y))
-        blit(ASSETS["flag"], (self.flag.x - camera_x, self.flag.y))
+        if _backdrop_owner is not self:
+            self._bake_background()
+        # One source blit of the visible window; only sprites are drawn on top
+        surf.blit(_backdrop, (0, 0), (camera_x, 0, W, H))
 
 # -------------------------------------------------
 # Overworld
 # -------------------------------------------------
 class Overworld:
-    __slots__ = ("nodes","current_index","unlocked","_labels")
+    __slots__ = ("nodes","current_index","unlocked","_labels","_xs","_ys","_label_xy")
     def __init__(self, total_levels=32):
         self.nodes = []
         self.current_index = 0
@@ -245,15 +323,26 @@ class Overworld:
             self.nodes.append(pygame.Rect(x, y, 30, 30))
         self._labels = [FONT.render(str(i + 1), True, (0, 0, 0))
                         for i in range(total_levels)]
+        # Node positions frozen into parallel int arrays (SoA) for the draw walk
+        self._xs = array("i", [n.x for n in self.nodes])
+        self._ys = array("i", [n.y for n in self.nodes])
+        self._label_xy = [lbl.get_rect(center=n.center).topleft
+                          for lbl, n in zip(self._labels, self.nodes)]
 
     def draw(self, surf):
-        blit = surf.blit
-        for i, node in enumerate(self.nodes):
-            img = ASSETS["node"] if i < self.unlocked else NODE_LOCKED
-            blit(img, node.topleft)
-            label = self._labels[i]
-            blit(label, label.get_rect(center=node.center))
-        blit(ASSETS["castle"], (self.nodes[-1].x - 15, self.nodes[-1].y - 15))
+        nodes, labels = _NODE_BLITS, _LABEL_BLITS
+        nodes.clear()
+        labels.clear()
+        img_tbl = (NODE_LOCKED, ASSETS["node"])
+        unlocked = self.unlocked
+        xs, ys = self._xs, self._ys
+        label_surfs, label_xy = self._labels, self._label_xy
+        for i in range(len(xs)):
+            nodes.append((img_tbl[i < unlocked], (xs[i], ys[i])))
+            labels.append((label_surfs[i], label_xy[i]))
+        surf.blits(nodes, doreturn=False)
+        surf.blits(labels, doreturn=False)
+        surf.blit(ASSETS["castle"], (self.nodes[-1].x - 15, self.nodes[-1].y - 15))
         pygame.draw.rect(surf, (255, 255, 0), self.nodes[self.current_index], 3)
 
     def move(self, dx, dy):
@@ -262,12 +351,16 @@ class Overworld:
         if 0 <= new < self.unlocked:
             self.current_index = new
 
+# Every level built once at startup; layouts are fixed, so plays reuse them as-is
+LEVEL_CACHE = {n: Level(n) for n in range(1, 33)}
+
 # -------------------------------------------------
 # Gameplay with flag clear (fixed-step update)
 # -------------------------------------------------
 def play_level(level_num):
-    mario = Mario(50, H - 100)
-    level = Level(level_num)
+    mario = _MARIO_POOL
+    mario.reset(50, H - 100)
+    level = LEVEL_CACHE[level_num]
     camera_x = 0
     clearing = False
     walking = False
@@ -277,7 +370,7 @@ def play_level(level_num):
         # --- Events
         for e in pygame.event.get():
             if e.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
+                return None  # quit requested; main() shuts pygame down
             if not clearing and e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE:
                 return False
 
@@ -290,40 +383,40 @@ def play_level(level_num):
         # --- Fixed-step updates
         while accumulator >= FIXED_DT:
             if not clearing:
-                mario.step(keys, level)
-            else:
-                # Flag animation and auto-walk (fixed-step)
-                if not walking:
-                    if mario.rect.bottom < H - TILE:
-                        mario.pos_y += 4
-                        mario.rect.y = int(mario.pos_y)
-                    else:
-                        walking = True
-                else:
-                    mario.pos_x += 2
-                    mario.rect.x = int(mario.pos_x)
-                    if mario.rect.x > level.width - 400:
-                        return True
+                # All pending sub-steps in one kernel call; it stops early on the flag
+                n = mario.step(keys, level, int(accumulator / FIXED_DT))
+                accumulator -= n * FIXED_DT
 
-            # Freeze camera during clear
-            if not clearing:
+                # Camera follows until the clear starts, then freezes
                 max_scroll = max(0, level.width - W)
                 camera_x = mario.rect.centerx - W // 2
                 if camera_x < 0: camera_x = 0
                 if camera_x > max_scroll: camera_x = max_scroll
 
-            # Begin clear when touching flag
-            if not clearing and mario.rect.colliderect(level.flag):
-                clearing = True
-                mario.vel_x = 0.0
-                mario.vel_y = 0.0
-
+                # Begin clear when touching flag
+                if mario.rect.colliderect(level.flag):
+                    clearing = True
+                    mario.vel_x = 0.0
+                    mario.vel_y = 0.0
+                continue
+
+            # Flag animation and auto-walk (fixed-step)
+            if not walking:
+                if mario.rect.bottom < H - TILE:
+                    mario.pos_y += 4
+                    mario.rect.y = int(mario.pos_y)
+                else:
+                    walking = True
+            else:
+                mario.pos_x += 2
+                mario.rect.x = int(mario.pos_x)
+                if mario.rect.x > level.width - 400:
+                    return True
             accumulator -= FIXED_DT
 
         # --- Render
-        screen.fill((92, 148, 252))
-        level.draw(screen, int(camera_x))
-        screen.blit(mario.image, (mario.rect.x - int(camera_x), mario.rect.y))
+        level.draw(screen, camera_x)
+        screen.blit(mario.image, (mario.rect.x - camera_x, mario.rect.y))
         pygame.display.flip()
 
 # -------------------------------------------------
@@ -331,10 +424,12 @@ def play_level(level_num):
 # -------------------------------------------------
 def main():
     overworld = Overworld()
-    while True:
+    running = True
+    while running:
         for e in pygame.event.get():
             if e.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
+                running = False
+                break
             if e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_LEFT:  overworld.move(-1, 0)
                 if e.key == pygame.K_RIGHT: overworld.move(1, 0)
@@ -343,13 +438,19 @@ def main():
                 if e.key == pygame.K_RETURN:
                     if overworld.current_index < overworld.unlocked:
                         cleared = play_level(overworld.current_index + 1)
+                        if cleared is None:
+                            running = False
+                            break
                         if cleared:
                             overworld.unlocked = min(overworld.unlocked + 1, len(overworld.nodes))
+        if not running:
+            break  # quit requested: skip remaining events and the frame
 
         screen.fill((0, 0, 0))
         overworld.draw(screen)
         pygame.display.flip()
         clock.tick(FPS)  # run overworld at 60 as well
+    pygame.quit()
 
 if __name__ == "__main__":
     main()